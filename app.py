@@ -1,6 +1,9 @@
 import os
 import base64
+import hashlib
 import io
+import sqlite3
+import threading
 import time
 import uuid
 import requests
@@ -11,25 +14,94 @@ import fitz  # PyMuPDF
 from PIL import Image
 import pandas as pd
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 import pdfplumber
 import re
 
 app = Flask(__name__)
 
+
+def _env_int(name, default, minimum=1):
+    """读取整数环境变量，无效或小于下限时使用默认值"""
+    value = os.environ.get(name, '').strip()
+    try:
+        number = int(value) if value else default
+    except ValueError:
+        print(f"⚠️ 环境变量 {name}={value!r} 不是整数，使用默认值 {default}")
+        number = default
+    return max(minimum, number)
+
+
+def _env_paths(name):
+    """读取以系统路径分隔符分隔的目录列表，忽略空项和不存在的目录"""
+    paths = []
+    for path in os.environ.get(name, '').split(os.pathsep):
+        path = path.strip()
+        if not path:
+            continue
+        if not os.path.isdir(path):
+            print(f"⚠️ 环境变量 {name} 中的目录不存在，已忽略：{path}")
+            continue
+        paths.append(path)
+    return paths
+
+
 # 使用相对路径，避免权限问题
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['PROCESSED_FOLDER'] = 'processed'
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB限制
+# 钻孔数据持久化索引，默认放在应用目录下的 data 目录，与启动时的工作目录无关
+app.config['INDEX_DB'] = os.environ.get('PDF_INDEX_DB') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'borehole_index.db')
+# 批量接口允许访问的服务器本地目录，多个目录用系统路径分隔符隔开；未配置时批量接口不可用
+app.config['BATCH_ROOTS'] = _env_paths('PDF_BATCH_ROOTS')
+app.config['BATCH_MAX_WORKERS'] = _env_int('PDF_BATCH_MAX_WORKERS', os.cpu_count() or 4)
 
 # 确保上传和处理目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
+os.makedirs(os.path.dirname(os.path.abspath(app.config['INDEX_DB'])), exist_ok=True)
 
 zoom_factor = 2.0
 
+# AI识别使用的模型及每个PDF最多处理的页数
+QWEN_MODEL = "qwen-vl-max-2025-08-13"
+AI_MAX_PAGES = 10
+
 # 目标层号配置
 TARGET_LAYERS = ['①1', '①2', '②1', '②2', '②3', '③', '④', '⑤1', '⑥', '⑦11', '⑦12', '⑦21', '⑦22', '⑦23', '⑨']
 
+# AI提取类型
+AI_EXTRACTION_TYPES = ('drill_data', 'soil_data', 'custom_data')
+
+# CSV表头
+AI_CSV_HEADERS = {
+    "drill_data": ["钻孔编号", "坐标（x，y)", "层次", "层深", "层厚", "层底标高"],
+    "soil_data": ["孔号", "孔深", "孔口标高", "层序", "层深", "标高"],
+}
+AI_CUSTOM_CSV_HEADER = ["提取结果"]
+TEXT_CSV_HEADER = ["钻孔编号", "坐标（x，y)", "层次", "标高", "深度", "厚度"]
+
+# 文本提取的匹配规则
+HOLE_PATTERNS = [
+    r'孔\s*号\s*[:：]?\s*(\w+)',
+    r'钻孔编号\s*[:：]?\s*(\w+)',
+    r'孔号\s*(\w+)',
+    r'钻孔号\s*(\w+)'
+]
+X_PATTERNS = [
+    r'X\s*[=＝]\s*([-\d\.]+)',
+    r'X坐标\s*[:：]?\s*([-\d\.]+)',
+    r'X\s*[:：]?\s*([-\d\.]+)'
+]
+Y_PATTERNS = [
+    r'Y\s*[=＝]\s*([-\d\.]+)',
+    r'Y坐标\s*[:：]?\s*([-\d\.]+)',
+    r'Y\s*[:：]?\s*([-\d\.]+)'
+]
+LAYER_PATTERN = r'([①②③④⑤⑥⑦⑧⑨⑩\d]+[a-zA-Z\d]*)\s+([-\d\.]+)\s+([-\d\.]+)\s+([-\d\.]+)'
+
 
 def image_to_base64(img: Image.Image, ext: str = "png") -> str:
     """PIL.Image → base64 data URI"""
@@ -41,9 +113,8 @@ def image_to_base64(img: Image.Image, ext: str = "png") -> str:
     return f"data:image/{mime};base64,{b64}"
 
 
-def call_qwen_api(image_base64, extraction_type, custom_prompt):
-    """直接使用 requests 调用 Qwen API"""
-    # 根据提取类型设置提示
+def build_qwen_prompts(extraction_type, custom_prompt=""):
+    """根据提取类型生成提示，返回 (系统提示, 用户提示, CSV格式要求)"""
     if extraction_type == "drill_data":
         system_prompt = "你是一个地质勘探专家，需要从图片中提取钻孔数据。"
         user_prompt = "提取图片的钻孔编号、坐标、层次、层深、层厚、层底标高列"
@@ -56,6 +127,12 @@ def call_qwen_api(image_base64, extraction_type, custom_prompt):
         system_prompt = "你是一个可以理解图片内容的助手，需要详细描述图片并回答相关问题。"
         user_prompt = custom_prompt
         csv_format = "请将提取的结果以CSV格式呈现，每行代表一条数据，仅返回CSV内容，不要添加任何额外说明文字"
+    return system_prompt, user_prompt, csv_format
+
+
+def call_qwen_api(image_base64, extraction_type, custom_prompt):
+    """直接使用 requests 调用 Qwen API"""
+    system_prompt, user_prompt, csv_format = build_qwen_prompts(extraction_type, custom_prompt)
 
     # 构建请求
     url = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
@@ -65,7 +142,7 @@ def call_qwen_api(image_base64, extraction_type, custom_prompt):
     }
 
     payload = {
-        "model": "qwen-vl-max-2025-08-13",
+        "model": QWEN_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": [
@@ -86,7 +163,7 @@ def call_qwen_api(image_base64, extraction_type, custom_prompt):
 
 
 def extract_data_from_image(img: Image.Image, extraction_type: str, custom_prompt: str = ""):
-    """从单张图片提取数据，返回数据行列表"""
+    """从单张图片提取数据，返回数据行列表；多次识别均失败时返回None"""
     for attempt in range(2):
         try:
             image_base64 = image_to_base64(img)
@@ -121,22 +198,293 @@ def extract_data_from_image(img: Image.Image, extraction_type: str, custom_promp
             print(f"⚠️ 第{attempt + 1}次识别失败：{e}")
             time.sleep(1)
 
-    return []
+    return None
+
+
+# ============================ 钻孔数据索引 ============================
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """计算文件内容的SHA-256哈希，用于识别已提取过的PDF"""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _to_float(value):
+    """将字符串转换为浮点数，失败返回None"""
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _split_coords(coords):
+    """拆分"x y"格式的坐标字符串"""
+    parts = str(coords or "").replace("，", " ").replace(",", " ").split()
+    x = _to_float(parts[0]) if len(parts) > 0 else None
+    y = _to_float(parts[1]) if len(parts) > 1 else None
+    return x, y
+
+
+class BoreholeIndex:
+    """钻孔数据的SQLite持久化索引，按PDF内容哈希缓存提取结果"""
+
+    # 表结构变化时递增，旧版本的缓存表会被重建
+    SCHEMA_VERSION = 1
+
+    ROW_COLUMNS = ["content_hash", "filename", "method", "extraction_type", "page", "side", "hole_id",
+                   "coords", "x", "y", "layer", "depth", "thickness", "elevation", "raw_line"]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        """创建表和索引"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+                conn.executescript("""
+                    DROP TABLE IF EXISTS pdf_files;
+                    DROP TABLE IF EXISTS borehole_rows;
+                """)
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pdf_files (
+                    content_hash TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    extraction_type TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL DEFAULT '',
+                    filename TEXT,
+                    data_count INTEGER,
+                    indexed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (content_hash, method, extraction_type, extractor_version)
+                );
+                CREATE TABLE IF NOT EXISTS borehole_rows (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_hash TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    extraction_type TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL DEFAULT '',
+                    row_index INTEGER,
+                    filename TEXT,
+                    page INTEGER,
+                    side TEXT,
+                    hole_id TEXT,
+                    coords TEXT,
+                    x REAL,
+                    y REAL,
+                    layer TEXT,
+                    depth TEXT,
+                    thickness TEXT,
+                    elevation TEXT,
+                    raw_line TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_rows_hole_id ON borehole_rows(hole_id);
+                CREATE INDEX IF NOT EXISTS idx_rows_layer ON borehole_rows(layer);
+                CREATE INDEX IF NOT EXISTS idx_rows_xy ON borehole_rows(x, y);
+                CREATE INDEX IF NOT EXISTS idx_rows_file
+                    ON borehole_rows(content_hash, method, extraction_type, extractor_version);
+            """)
+
+    def get_file_rows(self, content_hash, method, extraction_type, extractor_version="", force_refresh=False):
+        """获取已索引PDF的全部数据行，未索引或强制刷新时返回None"""
+        if force_refresh:
+            return None
+
+        key = (content_hash, method, extraction_type, extractor_version)
+        with closing(self._connect()) as conn:
+            found = conn.execute(
+                "SELECT 1 FROM pdf_files WHERE content_hash = ? AND method = ? "
+                "AND extraction_type = ? AND extractor_version = ?", key).fetchone()
+            if not found:
+                return None
+            rows = conn.execute(
+                "SELECT * FROM borehole_rows WHERE content_hash = ? AND method = ? "
+                "AND extraction_type = ? AND extractor_version = ? ORDER BY row_index", key).fetchall()
+        return [dict(row) for row in rows]
+
+    def upsert_file(self, content_hash, filename, method, extraction_type, rows, extractor_version=""):
+        """写入一个PDF的提取结果，覆盖同一文件同一提取方式的旧结果（包括旧版本提取器的结果）"""
+        key = (content_hash, method, extraction_type, extractor_version)
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._delete(conn, "content_hash = ? AND method = ? AND extraction_type = ?",
+                         (content_hash, method, extraction_type))
+            conn.execute(
+                "INSERT INTO pdf_files "
+                "(content_hash, method, extraction_type, extractor_version, filename, data_count) "
+                "VALUES (?, ?, ?, ?, ?, ?)", key + (filename, len(rows)))
+            conn.executemany(
+                "INSERT INTO borehole_rows "
+                "(content_hash, method, extraction_type, extractor_version, row_index, filename, page, side, "
+                "hole_id, coords, x, y, layer, depth, thickness, elevation, raw_line) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [key + (i, filename, row.get("page"), row.get("side"), row.get("hole_id"),
+                        row.get("coords"), row.get("x"), row.get("y"), row.get("layer"),
+                        row.get("depth"), row.get("thickness"), row.get("elevation"),
+                        row.get("raw_line"))
+                 for i, row in enumerate(rows)])
+
+    def delete_file(self, content_hash, method=None):
+        """删除一个PDF的索引结果，返回删除的缓存条目数"""
+        where, params = "content_hash = ?", [content_hash]
+        if method:
+            where += " AND method = ?"
+            params.append(method)
+        with self._lock, closing(self._connect()) as conn, conn:
+            return self._delete(conn, where, params)
+
+    @staticmethod
+    def _delete(conn, where, params):
+        conn.execute(f"DELETE FROM borehole_rows WHERE {where}", params)
+        return conn.execute(f"DELETE FROM pdf_files WHERE {where}", params).rowcount
+
+    def _query(self, where, params, limit):
+        sql = (f"SELECT {', '.join(self.ROW_COLUMNS)} FROM borehole_rows WHERE {where} "
+               f"ORDER BY hole_id, id LIMIT ?")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, list(params) + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def query_by_hole(self, hole_id, layer=None, limit=1000):
+        """按钻孔编号查询，可选限定层号"""
+        if layer:
+            return self._query("hole_id = ? AND layer = ?", (hole_id, layer), limit)
+        return self._query("hole_id = ?", (hole_id,), limit)
+
+    def query_by_layer(self, layer, limit=1000):
+        """按层号查询"""
+        return self._query("layer = ?", (layer,), limit)
+
+    def query_by_bbox(self, min_x, min_y, max_x, max_y, layer=None, limit=1000):
+        """按坐标范围查询"""
+        where = "x BETWEEN ? AND ? AND y BETWEEN ? AND ?"
+        params = [min_x, max_x, min_y, max_y]
+        if layer:
+            where += " AND layer = ?"
+            params.append(layer)
+        return self._query(where, params, limit)
+
+
+def ai_line_to_index_row(data_line, extraction_type, page_num, side, last_row=None):
+    """将AI识别的CSV行转换为索引行，续行沿用上一行的孔号和坐标"""
+    columns = [c.strip() for c in data_line.split(',')]
+    columns += [''] * (6 - len(columns))
+    row = {"page": page_num, "side": side, "raw_line": data_line}
+
+    if extraction_type == "drill_data":
+        # 钻孔编号,坐标（x，y),层次,层深,层厚,层底标高
+        row.update(hole_id=columns[0], coords=columns[1], layer=columns[2],
+                   depth=columns[3], thickness=columns[4], elevation=columns[5])
+    elif extraction_type == "soil_data":
+        # 孔号,孔深,孔口标高,层序,层深,标高
+        row.update(hole_id=columns[0], coords="", layer=columns[3],
+                   depth=columns[4], thickness="", elevation=columns[5])
+    else:
+        return row
+
+    if last_row:
+        if not row["hole_id"]:
+            row["hole_id"] = last_row.get("hole_id")
+        if not row["coords"] and row["hole_id"] == last_row.get("hole_id"):
+            row["coords"] = last_row.get("coords")
+    row["x"], row["y"] = _split_coords(row["coords"])
+    return row
+
+
+def text_item_to_index_row(item):
+    """将文本提取的数据项转换为索引行"""
+    coords = item.get("坐标（x，y)", "")
+    x = _to_float(item.get("X坐标"))
+    y = _to_float(item.get("Y坐标"))
+    if x is None and y is None:
+        x, y = _split_coords(coords)
+    layer = item.get("层次") or item.get("层号", "")
+    return {
+        "hole_id": item.get("钻孔编号", ""),
+        "coords": coords,
+        "x": x,
+        "y": y,
+        "layer": layer,
+        "depth": item.get("深度", ""),
+        "thickness": item.get("厚度", ""),
+        "elevation": item.get("标高", ""),
+        "raw_line": ",".join(str(v) for v in (item.get("钻孔编号", ""), coords, layer, item.get("标高", ""),
+                                              item.get("深度", ""), item.get("厚度", ""))),
+    }
+
+
+def index_row_to_text_item(row):
+    """将索引行还原为文本提取的数据项"""
+    return {
+        "钻孔编号": row["hole_id"],
+        "坐标（x，y)": row["coords"],
+        "X坐标": row["x"],
+        "Y坐标": row["y"],
+        "层号": row["layer"],
+        "标高": row["elevation"],
+        "深度": row["depth"],
+        "厚度": row["thickness"],
+    }
+
+
+def index_row_to_record(row, method, extraction_type):
+    """将索引行转换为按CSV表头命名的完整记录，续行补全孔号和坐标"""
+    if method == 'text':
+        return dict(zip(TEXT_CSV_HEADER, (row["hole_id"], row["coords"], row["layer"],
+                                          row["elevation"], row["depth"], row["thickness"])))
+
+    header = AI_CSV_HEADERS.get(extraction_type)
+    if not header:
+        return {AI_CUSTOM_CSV_HEADER[0]: row["raw_line"]}
+
+    columns = [c.strip() for c in row["raw_line"].split(',')]
+    record = dict(zip(header, columns + [''] * (len(header) - len(columns))))
+    record[header[0]] = row["hole_id"]
+    if extraction_type == "drill_data":
+        record[header[1]] = row["coords"]
+    return record
+
+
+def _config_hash(*parts):
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def ai_extractor_version(extraction_type, custom_prompt=""):
+    """AI提取器版本：模型、提示和图像参数变化后旧缓存自动失效"""
+    return _config_hash(QWEN_MODEL, build_qwen_prompts(extraction_type, custom_prompt), zoom_factor, AI_MAX_PAGES)
+
+
+def text_extractor_version(target_layers=None):
+    """文本提取器版本：目标层号和匹配规则变化后旧缓存自动失效"""
+    return _config_hash(target_layers or TARGET_LAYERS, HOLE_PATTERNS, X_PATTERNS, Y_PATTERNS, LAYER_PATTERN,
+                        pdfplumber.__version__)
+
+
+borehole_index = BoreholeIndex(app.config['INDEX_DB'])
 
 
 # ============================ AI图像识别功能 ============================
 
 def process_pdf_with_ai(pdf_path: Path, extraction_type: str, custom_prompt: str = "", csv_writer=None):
-    """使用AI处理单个PDF文件"""
+    """使用AI处理单个PDF文件，返回 (数据条数, 是否有识别失败)"""
     pdf_name = pdf_path.stem
     data_count = 0
+    had_errors = False
 
     try:
         doc = fitz.open(pdf_path)
         total_pages = doc.page_count
 
         # 限制处理的页数
-        max_pages = min(total_pages, 10)
+        max_pages = min(total_pages, AI_MAX_PAGES)
 
         for page_idx in range(max_pages):
             page = doc[page_idx]
@@ -152,6 +500,9 @@ def process_pdf_with_ai(pdf_path: Path, extraction_type: str, custom_prompt: str
             # 处理左右两部分图片
             for side, pil_img in zip(("left", "right"), (left_img, right_img)):
                 data_lines = extract_data_from_image(pil_img, extraction_type, custom_prompt)
+                if data_lines is None:
+                    had_errors = True
+                    continue
 
                 if data_lines:
                     # 将数据写入CSV文件
@@ -161,10 +512,10 @@ def process_pdf_with_ai(pdf_path: Path, extraction_type: str, custom_prompt: str
                             data_count += 1
 
         doc.close()
-        return data_count
+        return data_count, had_errors
     except Exception as e:
         print(f"❌ AI处理 {pdf_path} 出错：{e}")
-        return data_count
+        return data_count, True
 
 
 class AI_CSVWriter:
@@ -180,18 +531,14 @@ class AI_CSVWriter:
         self.file_initialized = False
         self.is_first_file = True
         self.is_first_line_of_first_file = True
+        self.index_rows = []
 
         # 初始化CSV文件，写入表头
         self._write_header()
 
     def _write_header(self):
         """写入CSV表头"""
-        if self.extraction_type == "drill_data":
-            header = "钻孔编号,坐标（x，y),层次,层深,层厚,层底标高\n"
-        elif self.extraction_type == "soil_data":
-            header = "孔号,孔深,孔口标高,层序,层深,标高\n"
-        else:
-            header = "提取结果\n"
+        header = ",".join(AI_CSV_HEADERS.get(self.extraction_type, AI_CUSTOM_CSV_HEADER)) + "\n"
 
         with open(self.csv_path, "w", encoding="utf-8") as f:
             f.write(header)
@@ -248,6 +595,10 @@ class AI_CSVWriter:
         if not data_line.strip():
             return
 
+        # 记录索引行（保留完整原始行，不受续行省略影响）
+        last_row = self.index_rows[-1] if self.index_rows else None
+        self.index_rows.append(ai_line_to_index_row(data_line, self.extraction_type, page_num, side, last_row))
+
         # 提取当前行的钻孔编号
         current_drill_id = self._extract_drill_id(data_line)
 
@@ -303,33 +654,60 @@ class AI_CSVWriter:
             self.is_first_file = False
 
         self.current_file_first_drill_id = None
+        self.index_rows = []
 
     def finish_current_file(self, pdf_name):
         """完成当前文件处理"""
         pass
 
 
-def process_ai_pdf_task(pdf_path, session_id, file_index, total_files, extraction_type, custom_prompt, csv_writer):
-    """处理单个PDF的AI任务函数"""
+def _task_status(data_count, had_errors):
+    """根据提取结果确定任务状态：completed / partial（部分失败）/ failed"""
+    if not had_errors:
+        return 'completed'
+    return 'partial' if data_count else 'failed'
+
+
+def process_ai_pdf_task(pdf_path, session_id, file_index, total_files, extraction_type, custom_prompt, csv_writer,
+                        force_refresh=False):
+    """处理单个PDF的AI任务函数，force_refresh=True 时忽略索引缓存重新识别"""
     pdf_name = Path(pdf_path).stem
 
+    extractor_version = ai_extractor_version(extraction_type, custom_prompt)
+    content_hash = file_content_hash(pdf_path)
+    cached_rows = borehole_index.get_file_rows(content_hash, 'ai', extraction_type, extractor_version,
+                                               force_refresh=force_refresh)
+
     # 开始处理新文件
     csv_writer.start_new_file(pdf_name)
 
-    # 使用AI处理PDF文件
-    data_count = process_pdf_with_ai(Path(pdf_path), extraction_type, custom_prompt, csv_writer)
+    if cached_rows is not None:
+        # 已提取过的PDF直接从索引回放
+        for row in cached_rows:
+            csv_writer.write_line(row['raw_line'], pdf_name, row['page'], row['side'])
+        data_count = len(cached_rows)
+        had_errors = False
+    else:
+        # 使用AI处理PDF文件
+        data_count, had_errors = process_pdf_with_ai(Path(pdf_path), extraction_type, custom_prompt, csv_writer)
 
     # 完成当前文件处理
     csv_writer.finish_current_file(pdf_name)
 
+    # 仅缓存完整提取的文件，任一部分识别失败的文件下次重新处理
+    index_rows = csv_writer.index_rows
+    if cached_rows is None and index_rows and not had_errors:
+        borehole_index.upsert_file(content_hash, pdf_name, 'ai', extraction_type, index_rows, extractor_version)
+
     # 更新进度
     progress = {
         'file_index': file_index,
         'total_files': total_files,
         'filename': pdf_name,
-        'status': 'completed',
+        'status': _task_status(data_count, had_errors),
         'data_count': data_count,
-        'method': 'ai'
+        'method': 'ai',
+        'from_index': cached_rows is not None
     }
 
     return progress
@@ -337,9 +715,10 @@ def process_ai_pdf_task(pdf_path, session_id, file_index, total_files, extractio
 
 # ============================ PDF文本提取功能 ============================
 
-def extract_borehole_data_with_pdfplumber(pdf_path: Path, target_layers=None):
+def extract_borehole_data_with_pdfplumber(pdf_path: Path, target_layers=None, errors=None):
     """
     使用pdfplumber从PDF文件中精确提取钻孔数据，只提取指定的层号
+    处理出错时返回已提取的部分数据，错误信息追加到errors列表
     """
     if target_layers is None:
         target_layers = TARGET_LAYERS
@@ -375,6 +754,8 @@ def extract_borehole_data_with_pdfplumber(pdf_path: Path, target_layers=None):
                     all_boreholes_data.append(combined_data)
     except Exception as e:
         print(f"pdfplumber处理出错: {e}")
+        if errors is not None:
+            errors.append(str(e))
 
     return all_boreholes_data
 
@@ -384,15 +765,8 @@ def extract_hole_info(text):
     精确提取孔号和坐标信息
     """
     # 多种孔号匹配模式
-    hole_patterns = [
-        r'孔\s*号\s*[:：]?\s*(\w+)',
-        r'钻孔编号\s*[:：]?\s*(\w+)',
-        r'孔号\s*(\w+)',
-        r'钻孔号\s*(\w+)'
-    ]
-
     hole_number = None
-    for pattern in hole_patterns:
+    for pattern in HOLE_PATTERNS:
         hole_match = re.search(pattern, text)
         if hole_match:
             hole_number = hole_match.group(1)
@@ -402,28 +776,16 @@ def extract_hole_info(text):
         return None
 
     # 匹配坐标 - 多种可能的格式
-    x_patterns = [
-        r'X\s*[=＝]\s*([-\d\.]+)',
-        r'X坐标\s*[:：]?\s*([-\d\.]+)',
-        r'X\s*[:：]?\s*([-\d\.]+)'
-    ]
-
-    y_patterns = [
-        r'Y\s*[=＝]\s*([-\d\.]+)',
-        r'Y坐标\s*[:：]?\s*([-\d\.]+)',
-        r'Y\s*[:：]?\s*([-\d\.]+)'
-    ]
-
     x_coord = None
     y_coord = None
 
-    for pattern in x_patterns:
+    for pattern in X_PATTERNS:
         x_match = re.search(pattern, text)
         if x_match:
             x_coord = x_match.group(1)
             break
 
-    for pattern in y_patterns:
+    for pattern in Y_PATTERNS:
         y_match = re.search(pattern, text)
         if y_match:
             y_coord = y_match.group(1)
@@ -444,8 +806,7 @@ def extract_layer_data(text, target_layers):
     layer_data = []
 
     # 改进的正则表达式，匹配更多可能的格式
-    layer_pattern = r'([①②③④⑤⑥⑦⑧⑨⑩\d]+[a-zA-Z\d]*)\s+([-\d\.]+)\s+([-\d\.]+)\s+([-\d\.]+)'
-    matches = re.findall(layer_pattern, text)
+    matches = re.findall(LAYER_PATTERN, text)
 
     for match in matches:
         # 清理数据，确保格式规范
@@ -487,11 +848,12 @@ class Text_CSVWriter:
     def __init__(self, csv_path):
         self.csv_path = csv_path
         self.file_initialized = False
+        self.index_rows = []
         self._write_header()
 
     def _write_header(self):
         """写入CSV表头"""
-        header = "钻孔编号,坐标（x，y),层次,标高,深度,厚度\n"
+        header = ",".join(TEXT_CSV_HEADER) + "\n"
         with open(self.csv_path, "w", encoding="utf-8") as f:
             f.write(header)
         self.file_initialized = True
@@ -503,42 +865,322 @@ class Text_CSVWriter:
                 row = [
                     item.get("钻孔编号", ""),
                     item.get("坐标（x，y)", ""),
-                    item.get("层次", ""),
+                    item.get("层次") or item.get("层号", ""),
                     item.get("标高", ""),
                     item.get("深度", ""),
                     item.get("厚度", ""),
 
                 ]
                 f.write(",".join(str(x) for x in row) + "\n")
+                self.index_rows.append(text_item_to_index_row(item))
+
+    def start_new_file(self, pdf_name):
+        """开始处理新文件，index_rows 只保留当前文件的数据行"""
+        self.index_rows = []
 
 
-def process_text_pdf_task(pdf_path, session_id, file_index, total_files, csv_writer):
-    """处理单个PDF的文本提取任务函数"""
+def process_text_pdf_task(pdf_path, session_id, file_index, total_files, csv_writer, force_refresh=False):
+    """处理单个PDF的文本提取任务函数，force_refresh=True 时忽略索引缓存重新提取"""
     pdf_name = Path(pdf_path).stem
 
-    # 使用pdfplumber处理PDF文件
-    borehole_data = extract_borehole_data_with_pdfplumber(Path(pdf_path))
+    extractor_version = text_extractor_version()
+    content_hash = file_content_hash(pdf_path)
+    cached_rows = borehole_index.get_file_rows(content_hash, 'text', 'borehole', extractor_version,
+                                               force_refresh=force_refresh)
+    errors = []
+
+    if cached_rows is not None:
+        # 已提取过的PDF直接从索引读取
+        borehole_data = [index_row_to_text_item(row) for row in cached_rows]
+    else:
+        # 使用pdfplumber处理PDF文件
+        borehole_data = extract_borehole_data_with_pdfplumber(Path(pdf_path), errors=errors)
 
     # 将数据写入CSV
+    csv_writer.start_new_file(pdf_name)
     if borehole_data:
         csv_writer.write_data(borehole_data)
         data_count = len(borehole_data)
     else:
         data_count = 0
 
+    # 仅缓存完整提取的文件
+    index_rows = csv_writer.index_rows
+    if cached_rows is None and index_rows and not errors:
+        borehole_index.upsert_file(content_hash, pdf_name, 'text', 'borehole', index_rows, extractor_version)
+
     # 更新进度
     progress = {
         'file_index': file_index,
         'total_files': total_files,
         'filename': pdf_name,
-        'status': 'completed',
+        'status': _task_status(data_count, bool(errors)),
         'data_count': data_count,
-        'method': 'text'
+        'method': 'text',
+        'from_index': cached_rows is not None
     }
 
     return progress
 
 
+# ============================ 批量处理功能 ============================
+
+BATCH_OUTPUT_FORMATS = ('csv', 'json', 'jsonl')
+
+# 后台批量任务状态，结束的任务保留 BATCH_JOB_TTL 秒供查询
+batch_jobs = {}
+batch_jobs_lock = threading.Lock()
+BATCH_JOB_TTL = 3600
+
+
+def collect_pdf_paths(paths, recursive=True, path_filter=None):
+    """
+    收集文件或目录中的PDF文件，返回去重后的绝对路径列表
+
+    每个文件都解析符号链接后再交给 path_filter 检查，不通过的文件被忽略
+    """
+    pdf_paths = []
+    seen = set()
+    for path in paths:
+        path = Path(path).expanduser().resolve()
+        if not path.exists():
+            raise FileNotFoundError(f"路径不存在: {path}")
+
+        if path.is_dir():
+            pattern = '**/*' if recursive else '*'
+            candidates = sorted(p for p in path.glob(pattern) if p.is_file() and p.suffix.lower() == '.pdf')
+        else:
+            candidates = [path] if path.suffix.lower() == '.pdf' else []
+
+        for pdf_path in candidates:
+            pdf_path = pdf_path.resolve()
+            if path_filter and not path_filter(pdf_path):
+                print(f"⚠️ 跳过不在允许目录内的文件：{pdf_path}")
+                continue
+            if pdf_path not in seen:
+                seen.add(pdf_path)
+                pdf_paths.append(pdf_path)
+    return pdf_paths
+
+
+def _batch_part_name(pdf_path):
+    """每个PDF对应的分片文件名（同名文件用路径哈希区分）"""
+    path_hash = hashlib.sha1(str(pdf_path).encode("utf-8")).hexdigest()[:8]
+    return f"{Path(pdf_path).stem}_{path_hash}.jsonl"
+
+
+def _load_part_rows(part_path):
+    with open(part_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _save_part_rows(part_path, rows):
+    tmp_path = f"{part_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, part_path)
+
+
+def _load_batch_state(state_path):
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_batch_state(state_path, state):
+    """原子写入批量任务状态，中断时不会留下损坏的文件"""
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _process_batch_file(pdf_path, part_path, method, batch_id, file_index, total_files,
+                        extraction_type, custom_prompt, force_refresh):
+    """
+    用独立的写入器处理单个PDF，便于并行执行
+
+    分片保存写入器收集的完整索引行（不含续行省略等显示格式），合并时再统一生成输出
+    """
+    if method == 'ai':
+        csv_writer = AI_CSVWriter(os.devnull, extraction_type)
+        progress = process_ai_pdf_task(str(pdf_path), batch_id, file_index, total_files,
+                                       extraction_type, custom_prompt, csv_writer, force_refresh)
+    else:
+        csv_writer = Text_CSVWriter(os.devnull)
+        progress = process_text_pdf_task(str(pdf_path), batch_id, file_index, total_files, csv_writer, force_refresh)
+
+    _save_part_rows(part_path, csv_writer.index_rows)
+    return progress
+
+
+def _merge_batch_parts(part_paths, output_path, method, extraction_type, output_format):
+    """按输入顺序合并分片并生成目标格式"""
+    if output_format == 'csv':
+        # 通过写入器回放，CSV格式与网页上传的结果一致
+        if method == 'ai':
+            csv_writer = AI_CSVWriter(output_path, extraction_type)
+            for part_path in part_paths:
+                pdf_name = Path(part_path).stem
+                csv_writer.start_new_file(pdf_name)
+                for row in _load_part_rows(part_path):
+                    csv_writer.write_line(row['raw_line'], pdf_name, row['page'], row['side'])
+                csv_writer.finish_current_file(pdf_name)
+        else:
+            csv_writer = Text_CSVWriter(output_path)
+            for part_path in part_paths:
+                csv_writer.write_data([index_row_to_text_item(row) for row in _load_part_rows(part_path)])
+        return
+
+    # JSON直接由完整的索引行生成，不受CSV显示格式影响
+    records = [index_row_to_record(row, method, extraction_type)
+               for part_path in part_paths for row in _load_part_rows(part_path)]
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        if output_format == 'json':
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def run_batch(pdf_paths, method, work_dir, output_path, extraction_type='drill_data', custom_prompt='',
+              workers=4, resume=False, output_format='csv', batch_id=None, progress_callback=None,
+              force_refresh=False):
+    """
+    批量处理服务器本地的PDF文件，不经过上传
+
+    每个PDF的数据行写入 work_dir/parts 下的独立分片，处理状态记录在 work_dir/batch_state.json；
+    resume=True 时跳过已完成的文件；force_refresh=True 时忽略钻孔索引缓存重新提取。
+    全部完成后按输入顺序合并到 output_path。
+    progress_callback(已完成文件数, 文件总数) 在开始时（计入续跑跳过的文件）及每个文件完成后调用。
+    """
+    if method not in ('ai', 'text'):
+        raise ValueError(f"不支持的处理方式: {method}")
+    if output_format not in BATCH_OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+
+    batch_id = batch_id or str(uuid.uuid4())
+    work_dir = Path(work_dir)
+    parts_dir = work_dir / 'parts'
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    state_path = work_dir / 'batch_state.json'
+
+    # 提取参数变化时之前的结果不可复用
+    options = {'method': method, 'extraction_type': extraction_type, 'custom_prompt': custom_prompt}
+    state = _load_batch_state(state_path) if resume else None
+    if not state or state.get('options') != options:
+        state = {'options': options, 'files': {}}
+    state_lock = threading.Lock()
+
+    pdf_paths = [Path(p) for p in pdf_paths]
+    part_paths = [parts_dir / _batch_part_name(p) for p in pdf_paths]
+    total_files = len(pdf_paths)
+
+    # 只跳过完整提取的文件；partial/failed 的文件续跑时重新处理
+    pending = []
+    for i, (pdf_path, part_path) in enumerate(zip(pdf_paths, part_paths)):
+        previous = state['files'].get(str(pdf_path))
+        if previous and previous.get('status') == 'completed' and part_path.exists():
+            continue
+        pending.append((i, pdf_path, part_path))
+    skipped_files = total_files - len(pending)
+    if progress_callback:
+        progress_callback(skipped_files, total_files)
+
+    def handle(file_index, pdf_path, part_path):
+        try:
+            progress = _process_batch_file(pdf_path, part_path, method, batch_id, file_index, total_files,
+                                           extraction_type, custom_prompt, force_refresh)
+        except Exception as e:
+            print(f"❌ 批量处理 {pdf_path} 出错：{e}")
+            progress = {
+                'file_index': file_index,
+                'total_files': total_files,
+                'filename': pdf_path.stem,
+                'status': 'failed',
+                'error': str(e),
+                'method': method
+            }
+
+        with state_lock:
+            state['files'][str(pdf_path)] = progress
+            _save_batch_state(state_path, state)
+        return progress
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(handle, *job) for job in pending]
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            progress = future.result()
+            print(f"批量处理进度: {skipped_files + done_count}/{total_files} - {progress['filename']}")
+            if progress_callback:
+                progress_callback(skipped_files + done_count, total_files)
+
+    # 部分失败的文件也输出已提取的数据行
+    results = [state['files'].get(str(p), {}) for p in pdf_paths]
+    statuses = [result.get('status') for result in results]
+    output_parts = [part for status, part in zip(statuses, part_paths)
+                    if status in ('completed', 'partial') and part.exists()]
+    _merge_batch_parts(output_parts, Path(output_path), method, extraction_type, output_format)
+
+    return {
+        'batch_id': batch_id,
+        'method': method,
+        'total_files': total_files,
+        'completed_files': statuses.count('completed'),
+        'partial_files': statuses.count('partial'),
+        'failed_files': total_files - statuses.count('completed') - statuses.count('partial'),
+        'skipped_files': skipped_files,
+        'from_index_files': sum(1 for result in results if result.get('from_index')),
+        'data_count': sum(result.get('data_count', 0) for result in results
+                          if result.get('status') in ('completed', 'partial')),
+        'output_path': str(output_path)
+    }
+
+
+def _is_allowed_batch_path(path):
+    """检查路径是否位于允许批量访问的目录内"""
+    path = Path(path).expanduser().resolve()
+    for root in app.config['BATCH_ROOTS']:
+        root = Path(root).expanduser().resolve()
+        if path == root or root in path.parents:
+            return True
+    return False
+
+
+def _run_batch_job(batch_id, **kwargs):
+    """后台线程执行批量任务并更新状态"""
+    def on_progress(finished_files, total_files):
+        with batch_jobs_lock:
+            batch_jobs[batch_id]['finished_files'] = finished_files
+
+    try:
+        summary = run_batch(batch_id=batch_id, progress_callback=on_progress, **kwargs)
+        with batch_jobs_lock:
+            batch_jobs[batch_id].update(status='completed', summary=summary, finished_at=time.time())
+    except Exception as e:
+        print(f"❌ 批量任务 {batch_id} 出错：{e}")
+        with batch_jobs_lock:
+            batch_jobs[batch_id].update(status='failed', error=str(e), finished_at=time.time())
+        return
+
+    # 全部文件完整提取后不再需要续跑，删除工作目录；有失败的文件时保留以便 resume
+    if not summary['partial_files'] and not summary['failed_files']:
+        import shutil
+        shutil.rmtree(kwargs['work_dir'], ignore_errors=True)
+
+
+def _evict_finished_batch_jobs():
+    """移除结束超过 BATCH_JOB_TTL 秒的任务状态，调用方需持有 batch_jobs_lock"""
+    now = time.time()
+    for batch_id in [batch_id for batch_id, job in batch_jobs.items()
+                     if 'finished_at' in job and now - job['finished_at'] > BATCH_JOB_TTL]:
+        del batch_jobs[batch_id]
+
+
 # ============================ 路由处理 ============================
 
 @app.route('/')
@@ -546,6 +1188,11 @@ def index():
     return render_template('index.html')
 
 
+def _form_flag(name):
+    """解析表单中的开关参数"""
+    return request.form.get(name, '').lower() in ('1', 'true', 'on')
+
+
 @app.route('/upload_ai', methods=['POST'])
 def upload_ai_file():
     """AI图像识别上传处理"""
@@ -559,6 +1206,7 @@ def upload_ai_file():
     # 获取提取类型和自定义提示
     extraction_type = request.form.get('extraction_type', 'drill_data')
     custom_prompt = request.form.get('custom_prompt', '')
+    force_refresh = _form_flag('force_refresh')
 
     # 生成会话ID
     session_id = str(uuid.uuid4())
@@ -587,7 +1235,7 @@ def upload_ai_file():
     total_data_count = 0
     for i, pdf_path in enumerate(pdf_paths):
         progress = process_ai_pdf_task(pdf_path, session_id, i, len(pdf_paths),
-                                       extraction_type, custom_prompt, csv_writer)
+                                       extraction_type, custom_prompt, csv_writer, force_refresh)
         total_data_count += progress['data_count']
 
         print(f"AI处理进度: {i + 1}/{len(pdf_paths)} - {progress['filename']}")
@@ -616,6 +1264,8 @@ def upload_text_file():
     if not files or files[0].filename == '':
         return jsonify({'error': '没有选择文件'}), 400
 
+    force_refresh = _form_flag('force_refresh')
+
     # 生成会话ID
     session_id = str(uuid.uuid4())
 
@@ -642,7 +1292,7 @@ def upload_text_file():
     # 顺序处理每个PDF文件
     total_data_count = 0
     for i, pdf_path in enumerate(pdf_paths):
-        progress = process_text_pdf_task(pdf_path, session_id, i, len(pdf_paths), csv_writer)
+        progress = process_text_pdf_task(pdf_path, session_id, i, len(pdf_paths), csv_writer, force_refresh)
         total_data_count += progress['data_count']
 
         print(f"文本提取进度: {i + 1}/{len(pdf_paths)} - {progress['filename']}")
@@ -668,17 +1318,192 @@ def download_file(filename):
         return send_file(file_path, as_attachment=True)
     return jsonify({'error': '文件不存在'}), 404
 
+def _index_query_limit():
+    """解析查询条数限制"""
+    try:
+        return max(1, min(int(request.args.get('limit', 1000)), 10000))
+    except ValueError:
+        return 1000
+
+
+@app.route('/index/boreholes/<hole_id>')
+def query_borehole(hole_id):
+    """按钻孔编号查询已索引的数据"""
+    rows = borehole_index.query_by_hole(hole_id, request.args.get('layer'), _index_query_limit())
+    return jsonify({'hole_id': hole_id, 'count': len(rows), 'rows': rows})
+
+
+@app.route('/index/layers/<layer>')
+def query_layer(layer):
+    """按层号查询已索引的数据"""
+    rows = borehole_index.query_by_layer(layer, _index_query_limit())
+    return jsonify({'layer': layer, 'count': len(rows), 'rows': rows})
+
+
+@app.route('/index/bbox')
+def query_bbox():
+    """按坐标范围查询已索引的数据"""
+    try:
+        bounds = [float(request.args[key]) for key in ('min_x', 'min_y', 'max_x', 'max_y')]
+    except (KeyError, ValueError):
+        return jsonify({'error': '需要数值参数 min_x, min_y, max_x, max_y'}), 400
+
+    rows = borehole_index.query_by_bbox(*bounds, layer=request.args.get('layer'), limit=_index_query_limit())
+    return jsonify({'bbox': bounds, 'count': len(rows), 'rows': rows})
+
+
+@app.route('/index/files/<content_hash>', methods=['DELETE'])
+def delete_indexed_file(content_hash):
+    """删除某个PDF的索引结果，下次处理时重新提取"""
+    deleted = borehole_index.delete_file(content_hash, request.args.get('method'))
+    if not deleted:
+        return jsonify({'error': '索引中不存在该文件'}), 404
+    return jsonify({'success': True, 'deleted': deleted})
+
+
+@app.route('/batch', methods=['POST'])
+def start_batch():
+    """批量处理服务器本地目录中的PDF（JSON接口）"""
+    if not app.config['BATCH_ROOTS']:
+        return jsonify({'error': '未配置 PDF_BATCH_ROOTS，批量接口不可用'}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须为JSON对象'}), 400
+
+    paths = data.get('paths') or []
+    if isinstance(paths, str):
+        paths = [paths]
+    if not paths:
+        return jsonify({'error': '没有指定路径'}), 400
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        return jsonify({'error': 'paths 必须为字符串或字符串列表'}), 400
+
+    denied = [p for p in paths if not _is_allowed_batch_path(p)]
+    if denied:
+        return jsonify({'error': '路径不在允许的目录内', 'paths': denied}), 403
+
+    method = data.get('method', 'text')
+    output_format = data.get('output_format', 'csv')
+    extraction_type = data.get('extraction_type', 'drill_data')
+    custom_prompt = data.get('custom_prompt', '')
+    if method not in ('ai', 'text'):
+        return jsonify({'error': f'不支持的处理方式: {method}'}), 400
+    if output_format not in BATCH_OUTPUT_FORMATS:
+        return jsonify({'error': f'不支持的输出格式: {output_format}'}), 400
+    if extraction_type not in AI_EXTRACTION_TYPES:
+        return jsonify({'error': f'不支持的提取类型: {extraction_type}'}), 400
+    if not isinstance(custom_prompt, str):
+        return jsonify({'error': 'custom_prompt 必须为字符串'}), 400
+
+    # 开关参数必须为JSON布尔值，避免 "false" 之类的字符串被当作真值
+    flags = {}
+    for name, default in (('recursive', True), ('resume', False), ('force_refresh', False)):
+        flags[name] = data.get(name, default)
+        if not isinstance(flags[name], bool):
+            return jsonify({'error': f'{name} 必须为布尔值'}), 400
+
+    workers = data.get('workers', 4)
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        return jsonify({'error': 'workers 必须为正整数'}), 400
+    workers = min(workers, app.config['BATCH_MAX_WORKERS'])
+
+    # 续跑时沿用原批次ID，复用其工作目录
+    resume = flags['resume']
+    batch_id = data.get('batch_id') if resume else None
+    if batch_id:
+        try:
+            batch_id = str(uuid.UUID(str(batch_id)))
+        except ValueError:
+            return jsonify({'error': '无效的批次ID'}), 400
+    else:
+        batch_id = str(uuid.uuid4())
+
+    try:
+        pdf_paths = collect_pdf_paths(paths, recursive=flags['recursive'], path_filter=_is_allowed_batch_path)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 400
+    if not pdf_paths:
+        return jsonify({'error': '没有有效的PDF文件'}), 400
+
+    output_filename = f"batch_{method}_{batch_id}.{output_format}"
+    with batch_jobs_lock:
+        _evict_finished_batch_jobs()
+        if batch_jobs.get(batch_id, {}).get('status') == 'running':
+            return jsonify({'error': '该批次正在处理中'}), 409
+        batch_jobs[batch_id] = {
+            'status': 'running',
+            'total_files': len(pdf_paths),
+            'finished_files': 0,
+            'download_url': f'/download/{output_filename}'
+        }
+
+    threading.Thread(target=_run_batch_job, args=(batch_id,), kwargs={
+        'pdf_paths': pdf_paths,
+        'method': method,
+        'work_dir': os.path.join(app.config['PROCESSED_FOLDER'], f'batch_{batch_id}'),
+        'output_path': os.path.join(app.config['PROCESSED_FOLDER'], output_filename),
+        'extraction_type': extraction_type,
+        'custom_prompt': custom_prompt,
+        'workers': workers,
+        'resume': resume,
+        'output_format': output_format,
+        'force_refresh': flags['force_refresh']
+    }, daemon=True).start()
+
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'total_files': len(pdf_paths),
+        'workers': workers,
+        'status_url': f'/batch/{batch_id}',
+        'download_url': f'/download/{output_filename}'
+    }), 202
+
+
+@app.route('/batch/<batch_id>')
+def batch_status(batch_id):
+    """查询批量任务状态"""
+    with batch_jobs_lock:
+        _evict_finished_batch_jobs()
+        job = batch_jobs.get(batch_id)
+        if job:
+            return jsonify({'batch_id': batch_id, **job})
+
+    # 服务重启后内存状态丢失，从工作目录读取，可通过 resume 续跑
+    try:
+        batch_id = str(uuid.UUID(batch_id))
+    except ValueError:
+        return jsonify({'error': '无效的批次ID'}), 400
+    state = _load_batch_state(os.path.join(app.config['PROCESSED_FOLDER'], f'batch_{batch_id}', 'batch_state.json'))
+    if not state:
+        return jsonify({'error': '批次不存在'}), 404
+
+    files = state.get('files', {}).values()
+    return jsonify({
+        'batch_id': batch_id,
+        'status': 'interrupted',
+        'finished_files': len(files),
+        'completed_files': sum(1 for p in files if p.get('status') == 'completed')
+    })
+
+
 # 定期清理旧文件
 def cleanup_old_files():
-    """清理一天前的处理文件"""
+    """清理一天前的处理文件和批量任务工作目录"""
     import datetime
+    import shutil
     now = datetime.datetime.now()
     for filename in os.listdir(app.config['PROCESSED_FOLDER']):
         file_path = os.path.join(app.config['PROCESSED_FOLDER'], filename)
-        if os.path.isfile(file_path):
+        is_batch_dir = os.path.isdir(file_path) and filename.startswith('batch_')
+        if os.path.isfile(file_path) or is_batch_dir:
             file_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
             if (now - file_time).days > 1:
-                os.remove(file_path)
+                if is_batch_dir:
+                    shutil.rmtree(file_path, ignore_errors=True)
+                else:
+                    os.remove(file_path)
 
 if __name__ == '__main__':
     cleanup_old_files()
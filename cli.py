@@ -0,0 +1,56 @@
+"""
+命令行批量提取入口，直接处理服务器本地的PDF文件
+
+示例：
+    python cli.py /data/pdfs --method text -o batch_output --workers 8
+    python cli.py /data/pdfs --method ai --extraction-type soil_data --format json --resume
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app import AI_EXTRACTION_TYPES, BATCH_OUTPUT_FORMATS, collect_pdf_paths, run_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量提取PDF钻孔数据")
+    parser.add_argument("paths", nargs="+", help="PDF文件或目录")
+    parser.add_argument("-m", "--method", choices=["ai", "text"], default="text", help="处理方式（默认 text）")
+    parser.add_argument("-t", "--extraction-type", choices=AI_EXTRACTION_TYPES,
+                        default="drill_data", help="AI提取类型（默认 drill_data）")
+    parser.add_argument("-p", "--prompt", default="", help="custom_data 类型的自定义提示")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="输出及断点状态目录（默认 batch_output）")
+    parser.add_argument("-f", "--format", choices=BATCH_OUTPUT_FORMATS, default="csv", help="输出格式（默认 csv）")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="并行处理的文件数（默认 4）")
+    parser.add_argument("--resume", action="store_true", help="跳过输出目录中已完整提取的文件，失败的文件重新处理")
+    parser.add_argument("--no-recursive", action="store_true", help="不递归子目录")
+    parser.add_argument("--force-refresh", action="store_true", help="忽略钻孔索引缓存，重新提取所有文件")
+    args = parser.parse_args(argv)
+
+    try:
+        pdf_paths = collect_pdf_paths(args.paths, recursive=not args.no_recursive)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not pdf_paths:
+        parser.error("没有有效的PDF文件")
+
+    output_dir = Path(args.output_dir)
+    summary = run_batch(
+        pdf_paths,
+        args.method,
+        work_dir=output_dir,
+        output_path=output_dir / f"{args.method}_extracted_data.{args.format}",
+        extraction_type=args.extraction_type,
+        custom_prompt=args.prompt,
+        workers=args.workers,
+        resume=args.resume,
+        output_format=args.format,
+        force_refresh=args.force_refresh,
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if summary["failed_files"] or summary["partial_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,8 +38,8 @@ fi
 echo "✅ 项目文件检查通过"
 
 echo "步骤 3/6: 创建数据目录..."
-mkdir -p uploads processed
-chmod 755 uploads processed
+mkdir -p uploads processed data
+chmod 755 uploads processed data
 echo "✅ 数据目录创建完成"
 
 echo "步骤 4/6: 构建 Docker 镜像..."
@@ -60,6 +60,7 @@ docker run -d \
   -p $PORT:5000 \
   -v $(pwd)/uploads:/app/uploads \
   -v $(pwd)/processed:/app/processed \
+  -v $(pwd)/data:/app/data \
   --name $CONTAINER_NAME \
   --restart unless-stopped \
   $APP_NAME
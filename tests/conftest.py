@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import fitz
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return app_module
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """替换为临时数据库中的钻孔索引"""
+    borehole_index = app_module.BoreholeIndex(str(tmp_path / "borehole_index.db"))
+    monkeypatch.setattr(app_module, "borehole_index", borehole_index)
+    return borehole_index
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """生成内容各不相同的单页PDF"""
+    def _make(name, text=None, folder="pdfs"):
+        path = tmp_path / folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), text or name)
+        doc.save(str(path))
+        doc.close()
+        return path
+    return _make
@@ -0,0 +1,222 @@
+import json
+import os
+
+import pytest
+
+import cli
+
+AI_LINES = ["ZK12,100.5 200.5,①1,2.0,2.0,3.1", ",,②1,4.0,2.0,1.1"]
+
+
+@pytest.fixture
+def text_extract(app, monkeypatch):
+    """文本提取打桩：孔号取自文件名，failing 中的文件模拟提取出错"""
+    calls = []
+    failing = set()
+
+    def fake_extract(pdf_path, target_layers=None, errors=None):
+        calls.append(pdf_path.name)
+        if pdf_path.name in failing:
+            errors.append("boom")
+            return []
+        return [{"钻孔编号": f"ZK{pdf_path.stem}", "坐标（x，y)": "10 20", "X坐标": "10", "Y坐标": "20",
+                 "层号": "①1", "标高": "3.1", "深度": "2.0", "厚度": "2.0"}]
+
+    monkeypatch.setattr(app, "extract_borehole_data_with_pdfplumber", fake_extract)
+    fake_extract.calls = calls
+    fake_extract.failing = failing
+    return fake_extract
+
+
+def _run(app, tmp_path, method="text", output_format="csv", **kwargs):
+    output_path = tmp_path / "out" / f"result.{output_format}"
+    summary = app.run_batch(app.collect_pdf_paths([tmp_path / "pdfs"]), method, tmp_path / "out", output_path,
+                            output_format=output_format, workers=2, **kwargs)
+    return summary, output_path
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+def test_text_batch_json_formats(app, index, make_pdf, text_extract, tmp_path, output_format):
+    make_pdf("1.pdf")
+    make_pdf("2.pdf")
+
+    summary, output_path = _run(app, tmp_path, output_format=output_format)
+
+    text = output_path.read_text(encoding="utf-8")
+    records = json.loads(text) if output_format == "json" else [json.loads(line) for line in text.splitlines()]
+    assert summary["completed_files"] == 2
+    assert records == [
+        {"钻孔编号": "ZK1", "坐标（x，y)": "10 20", "层次": "①1", "标高": "3.1", "深度": "2.0", "厚度": "2.0"},
+        {"钻孔编号": "ZK2", "坐标（x，y)": "10 20", "层次": "①1", "标高": "3.1", "深度": "2.0", "厚度": "2.0"},
+    ]
+
+
+def test_text_batch_csv(app, index, make_pdf, text_extract, tmp_path):
+    make_pdf("1.pdf")
+    make_pdf("2.pdf")
+
+    _, output_path = _run(app, tmp_path)
+
+    assert output_path.read_text(encoding="utf-8").splitlines() == [
+        ",".join(app.TEXT_CSV_HEADER),
+        "ZK1,10 20,①1,3.1,2.0,2.0",
+        "ZK2,10 20,①1,3.1,2.0,2.0",
+    ]
+
+
+def test_ai_batch_json_keeps_continuation_rows_complete(app, index, make_pdf, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "extract_data_from_image", lambda *args: AI_LINES)
+    make_pdf("1.pdf")
+
+    _, output_path = _run(app, tmp_path, method="ai", output_format="json")
+
+    records = json.loads(output_path.read_text(encoding="utf-8"))
+    assert len(records) == 4
+    assert {(r["钻孔编号"], r["坐标（x，y)"]) for r in records} == {("ZK12", "100.5 200.5")}
+    assert [r["层次"] for r in records] == ["①1", "②1", "①1", "②1"]
+
+
+def test_resume_skips_completed_and_retries_failed(app, index, make_pdf, text_extract, tmp_path):
+    make_pdf("1.pdf")
+    make_pdf("2.pdf")
+    text_extract.failing.add("2.pdf")
+
+    summary, _ = _run(app, tmp_path)
+    assert (summary["completed_files"], summary["failed_files"]) == (1, 1)
+
+    text_extract.failing.clear()
+    text_extract.calls.clear()
+    progress = []
+    summary, output_path = _run(app, tmp_path, resume=True,
+                                progress_callback=lambda finished, total: progress.append((finished, total)))
+
+    assert text_extract.calls == ["2.pdf"]
+    assert summary["skipped_files"] == 1
+    assert summary["completed_files"] == 2
+    assert progress == [(1, 2), (2, 2)]
+    assert len(output_path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_rerun_without_resume_reprocesses_from_index(app, index, make_pdf, text_extract, tmp_path):
+    make_pdf("1.pdf")
+
+    _run(app, tmp_path)
+    summary, _ = _run(app, tmp_path)
+
+    assert summary["skipped_files"] == 0
+    assert summary["from_index_files"] == 1
+    assert text_extract.calls == ["1.pdf"]
+
+
+def test_collect_pdf_paths_filters_symlinks_outside_root(app, make_pdf, tmp_path):
+    inside = make_pdf("a.pdf", folder="root")
+    outside = make_pdf("secret.pdf", folder="outside")
+    os.symlink(outside, tmp_path / "root" / "link.pdf")
+
+    def allowed(path):
+        return (tmp_path / "root").resolve() in path.parents
+
+    assert app.collect_pdf_paths([tmp_path / "root"], path_filter=allowed) == [inside.resolve()]
+    with pytest.raises(FileNotFoundError):
+        app.collect_pdf_paths([tmp_path / "missing"])
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"paths": ["ROOT"], "recursive": "false"}, "recursive"),
+    ({"paths": ["ROOT"], "workers": 0}, "workers"),
+    ({"paths": ["ROOT"], "extraction_type": "other"}, "提取类型"),
+    ({"paths": ["/"]}, "允许的目录"),
+])
+def test_batch_api_rejects_invalid_input(app, monkeypatch, tmp_path, body, message):
+    monkeypatch.setitem(app.app.config, "BATCH_ROOTS", [str(tmp_path)])
+    body["paths"] = [str(tmp_path) if p == "ROOT" else p for p in body["paths"]]
+
+    response = app.app.test_client().post("/batch", json=body)
+
+    assert response.status_code in (400, 403)
+    assert message in response.get_json()["error"]
+
+
+def test_batch_api_disabled_without_roots(app, monkeypatch):
+    monkeypatch.setitem(app.app.config, "BATCH_ROOTS", [])
+    assert app.app.test_client().post("/batch", json={"paths": ["/"]}).status_code == 403
+
+
+def test_cli(app, index, make_pdf, text_extract, tmp_path):
+    make_pdf("1.pdf")
+
+    exit_code = cli.main([str(tmp_path / "pdfs"), "-o", str(tmp_path / "out"), "-f", "jsonl"])
+
+    assert exit_code == 0
+    output = (tmp_path / "out" / "text_extracted_data.jsonl").read_text(encoding="utf-8")
+    assert json.loads(output)["钻孔编号"] == "ZK1"
+
+
+def _start_job(app, tmp_path, batch_id):
+    app.batch_jobs[batch_id] = {'status': 'running', 'total_files': 2, 'finished_files': 0}
+    work_dir = tmp_path / "work"
+    app._run_batch_job(batch_id, pdf_paths=app.collect_pdf_paths([tmp_path / "pdfs"]), method="text",
+                       work_dir=str(work_dir), output_path=str(tmp_path / "out.csv"))
+    return work_dir
+
+
+def test_batch_job_removes_work_dir_after_success(app, index, make_pdf, text_extract, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "batch_jobs", {})
+    make_pdf("1.pdf")
+    make_pdf("2.pdf")
+
+    work_dir = _start_job(app, tmp_path, "job")
+
+    assert app.batch_jobs["job"]["status"] == "completed"
+    assert app.batch_jobs["job"]["finished_files"] == 2
+    assert not work_dir.exists()
+    assert (tmp_path / "out.csv").exists()
+
+
+def test_batch_job_keeps_work_dir_for_resume(app, index, make_pdf, text_extract, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "batch_jobs", {})
+    make_pdf("1.pdf")
+    make_pdf("2.pdf")
+    text_extract.failing.add("2.pdf")
+
+    work_dir = _start_job(app, tmp_path, "job")
+
+    assert (work_dir / "batch_state.json").exists()
+
+
+def test_finished_batch_jobs_are_evicted(app, monkeypatch):
+    monkeypatch.setattr(app, "batch_jobs", {
+        "old": {'status': 'completed', 'finished_at': 0},
+        "recent": {'status': 'completed', 'finished_at': app.time.time()},
+        "running": {'status': 'running'},
+    })
+
+    app._evict_finished_batch_jobs()
+
+    assert set(app.batch_jobs) == {"recent", "running"}
+
+
+def test_cleanup_removes_stale_batch_dirs(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.app.config, "PROCESSED_FOLDER", str(tmp_path))
+    stale = tmp_path / "batch_old"
+    (stale / "parts").mkdir(parents=True)
+    fresh = tmp_path / "batch_new"
+    fresh.mkdir()
+    old_time = app.time.time() - 3 * 86400
+    os.utime(stale, (old_time, old_time))
+
+    app.cleanup_old_files()
+
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+@pytest.mark.parametrize("value, expected", [("", 4), ("abc", 4), ("0", 1), ("-3", 1), (" 8 ", 8)])
+def test_env_int(app, monkeypatch, value, expected):
+    monkeypatch.setenv("PDF_TEST_INT", value)
+    assert app._env_int("PDF_TEST_INT", 4) == expected
+
+
+def test_env_paths(app, monkeypatch, tmp_path):
+    monkeypatch.setenv("PDF_TEST_PATHS", os.pathsep.join(["", f" {tmp_path} ", str(tmp_path / "missing")]))
+    assert app._env_paths("PDF_TEST_PATHS") == [str(tmp_path)]
@@ -0,0 +1,140 @@
+AI_LINES = ["ZK12,100.5 200.5,①1,2.0,2.0,3.1", ",,②1,4.0,2.0,1.1"]
+
+TEXT_ITEMS = [
+    {"钻孔编号": "ZK7", "坐标（x，y)": "10 20", "X坐标": "10", "Y坐标": "20",
+     "层号": "①1", "标高": "3.1", "深度": "2.0", "厚度": "2.0"},
+    {"钻孔编号": "ZK7", "坐标（x，y)": "10 20", "X坐标": "10", "Y坐标": "20",
+     "层号": "②1", "标高": "1.1", "深度": "4.0", "厚度": "2.0"},
+]
+
+
+def _ai_rows(app):
+    rows = []
+    for line in AI_LINES:
+        rows.append(app.ai_line_to_index_row(line, "drill_data", 1, "left", rows[-1] if rows else None))
+    return rows
+
+
+def test_upsert_and_replay(app, index):
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app), "v1")
+
+    rows = index.get_file_rows("h1", "ai", "drill_data", "v1")
+    assert [row["raw_line"] for row in rows] == AI_LINES
+    # 续行沿用上一行的孔号和坐标
+    assert [(row["hole_id"], row["x"], row["y"]) for row in rows] == [("ZK12", 100.5, 200.5)] * 2
+
+    assert index.get_file_rows("h1", "ai", "drill_data", "v1", force_refresh=True) is None
+    assert index.get_file_rows("h1", "ai", "soil_data", "v1") is None
+
+
+def test_upsert_replaces_older_extractor_version(app, index):
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app), "v1")
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app)[:1], "v2")
+
+    assert index.get_file_rows("h1", "ai", "drill_data", "v1") is None
+    assert len(index.get_file_rows("h1", "ai", "drill_data", "v2")) == 1
+    assert len(index.query_by_hole("ZK12")) == 1
+
+
+def test_delete_file(app, index):
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app), "v1")
+
+    assert index.delete_file("h1", method="text") == 0
+    assert index.delete_file("h1") == 1
+    assert index.get_file_rows("h1", "ai", "drill_data", "v1") is None
+    assert index.query_by_hole("ZK12") == []
+
+
+def test_queries(app, index):
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app), "v1")
+    index.upsert_file("h2", "b", "text", "borehole",
+                      [app.text_item_to_index_row(item) for item in TEXT_ITEMS], "v1")
+
+    assert [row["layer"] for row in index.query_by_hole("ZK12")] == ["①1", "②1"]
+    assert [row["layer"] for row in index.query_by_hole("ZK12", layer="②1")] == ["②1"]
+    assert {row["hole_id"] for row in index.query_by_layer("①1")} == {"ZK7", "ZK12"}
+    assert {row["hole_id"] for row in index.query_by_bbox(0, 0, 50, 50)} == {"ZK7"}
+    assert [row["layer"] for row in index.query_by_bbox(100, 200, 101, 201, layer="①1")] == ["①1"]
+    assert len(index.query_by_layer("①1", limit=1)) == 1
+
+
+def test_query_routes(app, index):
+    index.upsert_file("h1", "a", "ai", "drill_data", _ai_rows(app), "v1")
+    client = app.app.test_client()
+
+    data = client.get("/index/boreholes/ZK12").get_json()
+    assert data["count"] == 2
+    assert client.get("/index/layers/②1").get_json()["count"] == 1
+    assert client.get("/index/bbox?min_x=100&min_y=200&max_x=101&max_y=201").get_json()["count"] == 2
+    assert client.get("/index/bbox?min_x=100").status_code == 400
+    assert client.delete("/index/files/h1").status_code == 200
+    assert client.delete("/index/files/h1").status_code == 404
+
+
+def test_ai_task_replays_from_index(app, index, make_pdf, monkeypatch, tmp_path):
+    calls = []
+
+    def fake_extract(img, extraction_type, custom_prompt=""):
+        calls.append(extraction_type)
+        return AI_LINES if not calls[1:] else []
+
+    monkeypatch.setattr(app, "extract_data_from_image", fake_extract)
+    pdf_path = make_pdf("a.pdf")
+
+    first_csv = tmp_path / "first.csv"
+    progress = app.process_ai_pdf_task(str(pdf_path), "s", 0, 1, "drill_data", "",
+                                       app.AI_CSVWriter(str(first_csv), "drill_data"))
+    assert progress["status"] == "completed"
+    assert not progress["from_index"]
+    assert len(calls) == 2  # 左右两半各识别一次
+
+    second_csv = tmp_path / "second.csv"
+    progress = app.process_ai_pdf_task(str(pdf_path), "s", 0, 1, "drill_data", "",
+                                       app.AI_CSVWriter(str(second_csv), "drill_data"))
+    assert progress["from_index"]
+    assert progress["data_count"] == 2
+    assert len(calls) == 2
+    assert second_csv.read_text(encoding="utf-8") == first_csv.read_text(encoding="utf-8")
+
+    progress = app.process_ai_pdf_task(str(pdf_path), "s", 0, 1, "drill_data", "",
+                                       app.AI_CSVWriter(str(second_csv), "drill_data"), force_refresh=True)
+    assert not progress["from_index"]
+    assert len(calls) == 4
+
+
+def test_ai_task_does_not_cache_partial_failure(app, index, make_pdf, monkeypatch, tmp_path):
+    results = iter([AI_LINES, None])
+    monkeypatch.setattr(app, "extract_data_from_image", lambda *args: next(results))
+    pdf_path = make_pdf("a.pdf")
+
+    progress = app.process_ai_pdf_task(str(pdf_path), "s", 0, 1, "drill_data", "",
+                                       app.AI_CSVWriter(str(tmp_path / "out.csv"), "drill_data"))
+    assert progress["status"] == "partial"
+    assert progress["data_count"] == 2
+    assert index.query_by_hole("ZK12") == []
+
+
+def test_ai_cache_key_depends_on_prompt(app):
+    assert app.ai_extractor_version("custom_data", "a") != app.ai_extractor_version("custom_data", "b")
+    assert app.ai_extractor_version("drill_data") != app.ai_extractor_version("soil_data")
+
+
+def test_text_task_replays_from_index(app, index, make_pdf, monkeypatch, tmp_path):
+    calls = []
+
+    def fake_extract(pdf_path, target_layers=None, errors=None):
+        calls.append(pdf_path)
+        return [dict(item) for item in TEXT_ITEMS]
+
+    monkeypatch.setattr(app, "extract_borehole_data_with_pdfplumber", fake_extract)
+    pdf_path = make_pdf("a.pdf")
+
+    first_csv = tmp_path / "first.csv"
+    app.process_text_pdf_task(str(pdf_path), "s", 0, 1, app.Text_CSVWriter(str(first_csv)))
+    second_csv = tmp_path / "second.csv"
+    progress = app.process_text_pdf_task(str(pdf_path), "s", 0, 1, app.Text_CSVWriter(str(second_csv)))
+
+    assert progress["from_index"]
+    assert len(calls) == 1
+    assert second_csv.read_text(encoding="utf-8") == first_csv.read_text(encoding="utf-8")
+    assert "ZK7,10 20,①1,3.1,2.0,2.0" in first_csv.read_text(encoding="utf-8")